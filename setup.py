@@ -3,11 +3,20 @@
 Boilerplate code needed to distribute package and include version in
 package.
 """
+import os.path
+
 from setuptools import setup
 
-with open("VERSION", "r") as in_file:
-    with open("src/olsen_randerson/__version__.py", "w") as out_file:
-        out_file.write("""\"\"\"Version for the package.\"\"\"
+VERSION_MODULE = "src/olsen_randerson/__version__.py"
+
+# Only rewrite the version module when VERSION has actually changed,
+# so repeated builds and editable installs neither reread the file
+# nor touch the module's mtime and retrigger downstream rebuilds.
+if not os.path.exists(VERSION_MODULE) or (
+        os.path.getmtime(VERSION_MODULE) < os.path.getmtime("VERSION")):
+    with open("VERSION", "r") as in_file:
+        with open(VERSION_MODULE, "w") as out_file:
+            out_file.write("""\"\"\"Version for the package.\"\"\"
 VERSION = "{ver:s}"
 """.format(ver=in_file.read()))
 
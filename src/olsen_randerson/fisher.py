@@ -9,7 +9,15 @@ present, this code uses rolling windows ending on the given day,
 because that is easy to get pandas to do.
 """
 
-from . import NEP_TO_GPP_FACTOR, Q10, T0
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:  # pragma: no cover
+    numba = None
+
+from . import NEP_TO_GPP_FACTOR, _RESP_A, _RESP_C, _resp_scaling
 
 INPUT_FREQUENCY = "1M"
 """The frequency at which the input data are given.
@@ -17,15 +25,221 @@ INPUT_FREQUENCY = "1M"
 Used to ensure the downscaled fluxes match the predictions of the
 original fluxes.
 """
+ROLLING_WINDOW = "30D"
+"""The window over which the downscaling inputs are averaged.
+
+Fisher et al. (2016) use a thirty-day mean of the environmental
+drivers rather than the calendar-month mean of the original
+Olsen-Randerson downscaling, to avoid discontinuities at month
+boundaries.
+"""
+
+
+def _window_length(freq, window=ROLLING_WINDOW):
+    """Find how many timesteps of `freq` cover the rolling window.
+
+    Parameters
+    ----------
+    freq : pd.DateOffset or str
+        The frequency of the data to be averaged.
+    window : str, optional
+        The averaging window, as a timedelta string.
+
+    Returns
+    -------
+    n_steps : int or None
+        The number of rows in a window ending on a given row,
+        matching the pandas convention of a window open on the left.
+        None if `freq` is missing or not a fixed timespan (e.g.
+        monthly), in which case the caller should fall back to the
+        pandas rolling machinery.
+    """
+    if freq is None:
+        return None
+    try:
+        step = pd.tseries.frequencies.to_offset(freq).nanos
+    except ValueError:
+        # Offsets like month ends do not describe a fixed timespan.
+        return None
+    span = pd.Timedelta(window).value
+    n_steps = span // step
+    if n_steps * step < span:
+        n_steps += 1
+    return int(n_steps)
+
+
+def _rolling_mean_30d(frame, window=None):
+    """Average `frame` over the thirty days ending at each time.
+
+    Equivalent to ``frame.rolling(ROLLING_WINDOW).mean()`` for the
+    fixed-frequency indices this module requires, but computed from a
+    single cumulative sum rather than pandas' per-window time
+    bookkeeping.  Windows at the start of the record average over the
+    rows available, as with ``min_periods=1``.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame[N, M]
+        The data to average.  Must have a datetime index with a set
+        frequency.
+    window : int, optional
+        The result of ``_window_length(frame.index.freq)``, if the
+        caller has it already.
+
+    Returns
+    -------
+    rolling_mean : pd.DataFrame[N, M]
+        The rolling mean of `frame`.
+    """
+    if window is None:
+        window = _window_length(frame.index.freq)
+    if window is None:
+        rolling_mean = frame.rolling(ROLLING_WINDOW).mean()
+        dtype = frame.to_numpy().dtype
+        if np.issubdtype(dtype, np.floating):
+            # pandas computes rolling means in double regardless of
+            # the input precision; cast back so float32 frames keep
+            # their working precision.
+            rolling_mean = rolling_mean.astype(dtype)
+        return rolling_mean
+    return pd.DataFrame(
+        _rolling_mean_values(np.asarray(frame), window),
+        index=frame.index, columns=frame.columns
+    )
+
+
+def _interpolate_to_index(flux, index, dtype=None, time_target=None):
+    """Linearly interpolate the columns of `flux` onto `index`.
+
+    Does the work of resampling `flux` to the frequency of `index`
+    and interpolating in time, but evaluates :func:`np.interp` at the
+    target times directly instead of building the intermediate
+    resampled frame.  Times outside the span of `flux` take the
+    nearest original value.
+
+    Parameters
+    ----------
+    flux : pd.DataFrame[N_large, M]
+        The fluxes to interpolate.  Must have a sorted datetime
+        index.
+    index : pd.DatetimeIndex[N]
+        The times to interpolate to.
+    dtype : np.dtype, optional
+        The dtype of the result; the floating dtype of `flux` by
+        default.
+    time_target : np.ndarray[N], optional
+        ``index.asi8``, if the caller has it already.
+
+    Returns
+    -------
+    baseline : np.ndarray[N, M]
+        The fluxes interpolated to `index`.
+    """
+    if time_target is None:
+        time_target = index.asi8
+    time_source = flux.index.asi8
+    values = flux.to_numpy()
+    if dtype is None:
+        dtype = values.dtype
+        if not np.issubdtype(dtype, np.floating):
+            dtype = np.float64
+    baseline = np.empty((len(index), values.shape[1]), dtype=dtype)
+    for col in range(values.shape[1]):
+        baseline[:, col] = np.interp(time_target, time_source,
+                                     values[:, col])
+    return baseline
+
+
+def _rolling_mean_values(values, window, scratch=None):
+    """Average `values` over a trailing window along the first axis.
+
+    Parameters
+    ----------
+    values : np.ndarray[N, ...]
+        The data to average.
+    window : int
+        The number of rows in a window ending on a given row.
+        Windows at the start of the record average over the rows
+        available, as with ``min_periods=1``.
+    scratch : np.ndarray[N + 1, ...], optional
+        Work space for the cumulative sum.  Callers computing several
+        rolling means of same-shaped data can pass the same array
+        each time to avoid the allocation.
+
+    Returns
+    -------
+    rolling_mean : np.ndarray[N, ...]
+        The rolling mean of `values`.
+    """
+    n_times = values.shape[0]
+    if scratch is None:
+        scratch_dtype = values.dtype
+        if not np.issubdtype(scratch_dtype, np.floating):
+            scratch_dtype = np.float64
+        scratch = np.empty(
+            (n_times + 1,) + values.shape[1:], dtype=scratch_dtype
+        )
+    cumulative = scratch
+    cumulative[0] = 0
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    starts = np.maximum(np.arange(n_times) + 1 - window, 0)
+    counts = np.minimum(np.arange(1, n_times + 1), window)
+    result = cumulative[1:] - cumulative[starts]
+    result /= counts.reshape((n_times,) + (1,) * (values.ndim - 1))
+    return result
+
+
+def _combine_downscaled(  # pragma: no cover
+        gpp_baseline, par_values, par_mean,
+        resp_baseline, temperature_values, resp_mean, out):
+    """Combine the baselines, drivers, and rolling means into NEE.
+
+    Parameters
+    ----------
+    gpp_baseline, par_values, par_mean : np.ndarray[N, M]
+        The interpolated :abbr:`GPP (Gross Primary Productivity)`
+        baseline, the :abbr:`PAR (Photosynthetically Active
+        Radiation)`, and its thirty-day rolling mean.
+    resp_baseline, temperature_values, resp_mean : np.ndarray[N, M]
+        The interpolated respiration baseline, the temperature in
+        degrees Celsius, and the thirty-day rolling mean of the
+        respiration scaling.
+    out : np.ndarray[N, M]
+        Array the downscaled :abbr:`NEE (Net Ecosystem Exchange)` is
+        written into.
+
+    Notes
+    -----
+    Compiled with :func:`numba.njit` when numba is importable.  The
+    columns are independent spatial cells, so the column loop runs
+    across threads in that case.  The respiration scaling is
+    recomputed from the temperature rather than passed in; the exp is
+    cheap and recomputing it keeps a full scaling array out of
+    memory.
+    """
+    for col in numba.prange(out.shape[1]):
+        for t in range(out.shape[0]):
+            scaling = _RESP_A * np.exp(_RESP_C * temperature_values[t, col])
+            resp = resp_baseline[t, col] / resp_mean[t, col] * scaling
+            gpp = gpp_baseline[t, col] / par_mean[t, col] * par_values[t, col]
+            out[t, col] = resp - gpp
+
 
+if numba is not None:  # pragma: no cover
+    _combine_downscaled = numba.njit(
+        parallel=True, cache=True
+    )(_combine_downscaled)
 
-def downscale_timeseries(flux_nee, temperature, par):
+
+def downscale_timeseries(flux_nee, temperature, par, dtype=None):
     """Downscale the columns of flux_nee.
 
     The parts of the downscaled flux corresponding to the first and
-    last time periods in the original flux will be incomplete.  It is
-    recommended to provide an extra time period on each end to avoid
-    this.
+    last time periods in the original flux will be incomplete, and
+    rows of the downscaled index outside the time span of `flux_nee`
+    are held at the nearest original value rather than set to
+    missing.  It is recommended to provide an extra time period on
+    each end to avoid this.
 
     Parameters
     ----------
@@ -41,6 +255,10 @@ def downscale_timeseries(flux_nee, temperature, par):
         :abbr:`PAR (Photosynthetically Active Radiation)` at the small
         timesteps.  Must be greather than or equal to zero.  Must have
         datetime index with a set frequency.
+    dtype : np.dtype, optional
+        Working precision for the downscaling.  ``np.float32`` halves
+        the memory traffic for large grids; the default keeps the
+        precision of the inputs.
 
     Returns
     -------
@@ -56,19 +274,68 @@ def downscale_timeseries(flux_nee, temperature, par):
     :doi:`10.5194/bg-13-4271-2016`.
     """
     estimated_gpp = -NEP_TO_GPP_FACTOR * flux_nee
-    flux_gpp = downscale_gpp_timeseries(
-        estimated_gpp, par
-    )
-    flux_resp = downscale_resp_timeseries(
-        estimated_gpp + flux_nee, temperature
+    # estimated_gpp + flux_nee, without materializing the sum.
+    estimated_resp = (1 - NEP_TO_GPP_FACTOR) * flux_nee
+    window = _window_length(par.index.freq)
+    if window is None:
+        # Without a fixed timestep, leave the work to the pandas
+        # rolling machinery in the per-component helpers.
+        if dtype is not None:
+            temperature = temperature.astype(dtype)
+            par = par.astype(dtype)
+            estimated_gpp = estimated_gpp.astype(dtype)
+            estimated_resp = estimated_resp.astype(dtype)
+        flux_gpp = downscale_gpp_timeseries(estimated_gpp, par)
+        flux_resp = downscale_resp_timeseries(estimated_resp, temperature)
+        return flux_resp - flux_gpp
+    # The indices of par and temperature are required to be aligned,
+    # so after interpolating the baselines onto that index the
+    # arithmetic can run on the raw arrays; pandas label alignment is
+    # paid once in the reindex rather than on every operation.
+    time_target = par.index.asi8
+    gpp_baseline = _interpolate_to_index(estimated_gpp, par.index,
+                                         dtype=dtype,
+                                         time_target=time_target)
+    resp_baseline = _interpolate_to_index(estimated_resp,
+                                          temperature.index, dtype=dtype,
+                                          time_target=time_target)
+    par_values = par.to_numpy(dtype=dtype)
+    temperature_values = temperature.to_numpy(dtype=dtype)
+    # One cumulative-sum scratch serves both rolling means, and the
+    # mean arrays are then overwritten with the downscaled components
+    # so the combine step allocates nothing further.
+    scratch = np.empty(
+        (par_values.shape[0] + 1,) + par_values.shape[1:],
+        dtype=gpp_baseline.dtype,
     )
-    downscaled_nee = flux_resp - flux_gpp
-    return downscaled_nee
+    par_mean = _rolling_mean_values(par_values, window, scratch=scratch)
+    # Stream the respiration scaling through the scratch rather than
+    # keeping its own array: write it into the cumulative-sum slots,
+    # sum in place, and recompute the cheap exp at combine time.
+    _resp_scaling(temperature_values, out=scratch[1:])
+    resp_mean = _rolling_mean_values(scratch[1:], window, scratch=scratch)
+    if numba is not None:
+        downscaled_nee = np.empty_like(par_mean)
+        _combine_downscaled(gpp_baseline, par_values, par_mean,
+                            resp_baseline, temperature_values, resp_mean,
+                            downscaled_nee)
+    else:
+        np.divide(resp_baseline, resp_mean, out=resp_mean)
+        resp_scaling = _resp_scaling(temperature_values, out=resp_baseline)
+        np.multiply(resp_mean, resp_scaling, out=resp_mean)
+        np.divide(gpp_baseline, par_mean, out=par_mean)
+        np.multiply(par_mean, par_values, out=par_mean)
+        downscaled_nee = np.subtract(resp_mean, par_mean, out=resp_mean)
+    return pd.DataFrame(downscaled_nee, index=par.index, columns=par.columns)
 
 
-def downscale_gpp_timeseries(flux_gpp, par):
+def downscale_gpp_timeseries(flux_gpp, par, window=None):
     """Downscale the columns of flux_nee.
 
+    Rows of the downscaled index outside the time span of `flux_gpp`
+    are held at the nearest original value rather than set to
+    missing.
+
     Parameters
     ----------
     flux_gpp : pd.DataFrame[N_large, M]
@@ -79,6 +346,11 @@ def downscale_gpp_timeseries(flux_gpp, par):
         :abbr:`PAR (Photosynthetically Active Radiation)` at the small
         timesteps.  Must be greather than or equal to zero.  Must have
         datetime index with a set frequency.
+    window : int, optional
+        The rolling window as a number of rows, if the caller already
+        computed it with ``_window_length(par.index.freq)``.  Callers
+        downscaling many records on the same index can pass it to
+        skip the index introspection per call.
 
     Returns
     -------
@@ -96,19 +368,21 @@ def downscale_gpp_timeseries(flux_gpp, par):
     """
     # This is mean over thirty days prior to the given day.
     # I can't figure out how to get a centered window.
-    par_mean = par.rolling("30D").mean()
+    par_mean = _rolling_mean_30d(par, window=window)
     # Get the GPP timeseries to the same timestep as par
-    flux_gpp_baseline = flux_gpp.resample(
-        par.index.freq
-    ).interpolate(method="time")
+    flux_gpp_baseline = _interpolate_to_index(flux_gpp, par.index)
     # This would be where I would deal with the first and last several
     # timesteps.
     return flux_gpp_baseline / par_mean * par
 
 
-def downscale_resp_timeseries(flux_resp, temperature):
+def downscale_resp_timeseries(flux_resp, temperature, window=None):
     """Downscale the columns of flux_resp.
 
+    Rows of the downscaled index outside the time span of `flux_resp`
+    are held at the nearest original value rather than set to
+    missing.
+
     Parameters
     ----------
     flux_resp : pd.DataFrame[N_large, M]
@@ -119,6 +393,9 @@ def downscale_resp_timeseries(flux_resp, temperature):
         Temperature at the small timesteps.
         Must have datetime index with a set frequency
         Unit is expected to be degrees Celsius.
+    window : int, optional
+        The rolling window as a number of rows, if the caller already
+        computed it with ``_window_length(temperature.index.freq)``.
 
     Returns
     -------
@@ -133,15 +410,17 @@ def downscale_resp_timeseries(flux_resp, temperature):
     *Biogeosciences*, vol. 13, no. 14, 4271--4277,
     :doi:`10.5194/bg-13-4271-2016`.
     """
-    resp_scaling = Q10 ** ((temperature - T0) / 10)
+    resp_scaling = pd.DataFrame(
+        _resp_scaling(temperature.to_numpy()),
+        index=temperature.index, columns=temperature.columns,
+    )
     # This is mean over thirty days prior to the given day.
     # I can't figure out how to get a centered window.
-    resp_mean = resp_scaling.rolling("30D").mean()
+    resp_mean = _rolling_mean_30d(resp_scaling, window=window)
     # Get the Respiration timeseries on the same timestep as
     # temperature
-    flux_resp_baseline = flux_resp.resample(
-        temperature.index.freq
-    ).interpolate(method="time")
+    flux_resp_baseline = _interpolate_to_index(flux_resp,
+                                               temperature.index)
     # This is where I would deal with the first and last several
     # timesteps.
     return flux_resp_baseline / resp_mean * resp_scaling
@@ -5,6 +5,7 @@ import operator
 import numpy as np
 import numpy.testing as np_tst
 import pandas as pd
+import pytest
 
 from hypothesis import given, assume
 from hypothesis.extra.numpy import arrays
@@ -38,6 +39,203 @@ DOWNSCALED_INDEX = pd.date_range("2014-12-15T00:00:00",
                                  freq="1D")
 
 
+def _example_frames(seed):
+    """Build a small fixed set of inputs for the direct tests.
+
+    Parameters
+    ----------
+    seed : int
+        Seed for the random draws.
+
+    Returns
+    -------
+    flux_nee : pd.DataFrame[N_large, M]
+        A coarse flux on :data:`MONTH_CENTER_INDEX`.
+    temperature, par : pd.DataFrame[N, M]
+        Drivers on :data:`DOWNSCALED_INDEX`.
+    """
+    random = np.random.default_rng(seed=seed)
+    flux_nee = pd.DataFrame(
+        random.uniform(-5, 5, (len(MONTH_CENTER_INDEX), len(COLUMNS))),
+        index=MONTH_CENTER_INDEX, columns=COLUMNS,
+    )
+    temperature = pd.DataFrame(
+        random.uniform(-20, 30, (len(DOWNSCALED_INDEX), len(COLUMNS))),
+        index=DOWNSCALED_INDEX, columns=COLUMNS,
+    )
+    par = pd.DataFrame(
+        random.uniform(0.1, 100, (len(DOWNSCALED_INDEX), len(COLUMNS))),
+        index=DOWNSCALED_INDEX, columns=COLUMNS,
+    )
+    return flux_nee, temperature, par
+
+
+def test_window_length():
+    """Test the conversion of frequencies to window row counts."""
+    # Thirty days divide evenly into daily steps; a week does not, and
+    # the window rounds up to cover the full thirty days.
+    assert olsen_randerson.fisher._window_length("1D") == 30
+    assert olsen_randerson.fisher._window_length("7D") == 5
+    # No frequency, or one without a fixed timespan, means the caller
+    # must fall back to the pandas rolling machinery.
+    assert olsen_randerson.fisher._window_length(None) is None
+    assert olsen_randerson.fisher._window_length(
+        pd.offsets.MonthEnd()
+    ) is None
+
+
+@pytest.mark.parametrize("freq", ["1D", "7D"])
+def test_rolling_mean_30d_matches_pandas(freq):
+    """Test the cumulative-sum rolling mean against pandas rolling."""
+    index = pd.date_range("2015-01-01", periods=60, freq=freq)
+    random = np.random.default_rng(seed=len(freq))
+    frame = pd.DataFrame(
+        random.uniform(0, 100, (len(index), len(COLUMNS))),
+        index=index, columns=COLUMNS,
+    )
+    np_tst.assert_allclose(
+        olsen_randerson.fisher._rolling_mean_30d(frame),
+        frame.rolling("30D").mean(),
+    )
+
+
+def test_rolling_mean_30d_no_fixed_frequency():
+    """Test the fallback for an index without a fixed timestep."""
+    index = pd.DatetimeIndex(np.asarray(DOWNSCALED_INDEX))
+    assert index.freq is None
+    random = np.random.default_rng(seed=30)
+    frame = pd.DataFrame(
+        random.uniform(0, 100, (len(index), len(COLUMNS))),
+        index=index, columns=COLUMNS,
+    )
+    np_tst.assert_allclose(
+        olsen_randerson.fisher._rolling_mean_30d(frame),
+        frame.rolling("30D").mean(),
+    )
+
+
+def test_downscale_timeseries_matches_fallback():
+    """Test the fixed-frequency path against the pandas fallback.
+
+    Stripping the frequency from the driver indices sends the same
+    inputs through the per-component helpers and the pandas rolling
+    machinery, which the fixed-frequency path must reproduce.
+    """
+    flux_nee, temperature, par = _example_frames(seed=20160715)
+    downscaled = olsen_randerson.fisher.downscale_timeseries(
+        flux_nee, temperature, par
+    )
+    no_freq_index = pd.DatetimeIndex(np.asarray(DOWNSCALED_INDEX))
+    downscaled_fallback = olsen_randerson.fisher.downscale_timeseries(
+        flux_nee,
+        temperature.set_axis(no_freq_index),
+        par.set_axis(no_freq_index),
+    )
+    np_tst.assert_allclose(downscaled, downscaled_fallback)
+
+
+def test_rolling_mean_30d_integer_frames():
+    """Test integer frames through both rolling-mean paths.
+
+    Integer data gets float64 working buffers on the cumulative-sum
+    path and skips the precision-restoring cast on the fallback.
+    """
+    index = pd.date_range("2015-01-01", periods=40, freq="1D")
+    random = np.random.default_rng(seed=40)
+    frame = pd.DataFrame(
+        random.integers(0, 100, (len(index), len(COLUMNS))),
+        index=index, columns=COLUMNS,
+    )
+    expected = frame.rolling("30D").mean()
+    np_tst.assert_allclose(
+        olsen_randerson.fisher._rolling_mean_30d(frame), expected
+    )
+    no_freq = frame.set_axis(pd.DatetimeIndex(np.asarray(index)))
+    np_tst.assert_allclose(
+        olsen_randerson.fisher._rolling_mean_30d(no_freq), expected
+    )
+
+
+def test_interpolate_to_index_integer_flux():
+    """Test interpolation of an integer flux frame."""
+    flux = pd.DataFrame(
+        np.arange(len(MONTH_CENTER_INDEX) * len(COLUMNS)).reshape(
+            (len(MONTH_CENTER_INDEX), len(COLUMNS))
+        ),
+        index=MONTH_CENTER_INDEX, columns=COLUMNS,
+    )
+    baseline = olsen_randerson.fisher._interpolate_to_index(
+        flux, DOWNSCALED_INDEX
+    )
+    assert baseline.dtype == np.float64
+    np_tst.assert_allclose(
+        baseline,
+        olsen_randerson.fisher._interpolate_to_index(
+            flux.astype(float), DOWNSCALED_INDEX
+        ),
+    )
+
+
+def test_downscale_helpers_window_argument():
+    """Test passing a precomputed window to the per-component helpers."""
+    flux_nee, temperature, par = _example_frames(seed=5)
+    window = olsen_randerson.fisher._window_length(par.index.freq)
+    np_tst.assert_allclose(
+        olsen_randerson.fisher.downscale_gpp_timeseries(
+            flux_nee, par, window=window
+        ),
+        olsen_randerson.fisher.downscale_gpp_timeseries(flux_nee, par),
+    )
+    np_tst.assert_allclose(
+        olsen_randerson.fisher.downscale_resp_timeseries(
+            flux_nee, temperature, window=window
+        ),
+        olsen_randerson.fisher.downscale_resp_timeseries(
+            flux_nee, temperature
+        ),
+    )
+
+
+def test_downscale_timeseries_no_numba(monkeypatch):
+    """Test the plain-NumPy combine against the default path."""
+    flux_nee, temperature, par = _example_frames(seed=7)
+    reference = olsen_randerson.fisher.downscale_timeseries(
+        flux_nee, temperature, par
+    )
+    monkeypatch.setattr(olsen_randerson.fisher, "numba", None)
+    plain = olsen_randerson.fisher.downscale_timeseries(
+        flux_nee, temperature, par
+    )
+    np_tst.assert_allclose(plain, reference)
+
+
+@pytest.mark.parametrize("fixed_frequency", [True, False])
+def test_downscale_timeseries_dtype(fixed_frequency):
+    """Test the float32 working precision on both index kinds.
+
+    The fixed-frequency fast path and the pandas fallback must both
+    return frames of the requested dtype and stay close to the
+    float64 result, rather than quietly promoting.
+    """
+    flux_nee, temperature, par = _example_frames(seed=32)
+    if not fixed_frequency:
+        no_freq_index = pd.DatetimeIndex(np.asarray(DOWNSCALED_INDEX))
+        temperature = temperature.set_axis(no_freq_index)
+        par = par.set_axis(no_freq_index)
+    downscaled = olsen_randerson.fisher.downscale_timeseries(
+        flux_nee, temperature, par, dtype=np.float32
+    )
+    reference = olsen_randerson.fisher.downscale_timeseries(
+        flux_nee, temperature, par
+    )
+    assert (downscaled.dtypes == np.float32).all()
+    assert (reference.dtypes == np.float64).all()
+    np_tst.assert_allclose(
+        downscaled, reference, rtol=1e-4,
+        atol=1e-4 * reference.abs().to_numpy().max(),
+    )
+
+
 @given(
     arrays(
         float, (len(MONTH_CENTER_INDEX), len(COLUMNS)),
@@ -1,103 +1,424 @@
 """Test the Olsen-Randerson downscaling."""
+import os
+
 import numpy as np
 import numpy.testing as np_tst
+import pytest
 
-from hypothesis import given, assume
+from hypothesis import HealthCheck, given, settings
+from hypothesis import strategies as st
 from hypothesis.extra.numpy import arrays
 from hypothesis.strategies import floats
 
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """Stand in for numba.njit when numba is unavailable."""
+        def wrap(func):
+            return func
+        return wrap
+
 import olsen_randerson
 
-TEST_LENGTH = 6
-"""Number of time periods in test."""
+# The conservation property under test is purely algebraic, so a
+# couple dozen examples cover it; CI can ask for the full battery
+# with HYPOTHESIS_PROFILE=ci.  No deadline in either profile, so a
+# cold numba compile in the code under test cannot time anything out.
+settings.register_profile(
+    "fast", max_examples=25, deadline=None, derandomize=True,
+    suppress_health_check=[HealthCheck.filter_too_much],
+)
+settings.register_profile("ci", max_examples=100, deadline=None)
+settings.load_profile(os.environ.get("HYPOTHESIS_PROFILE", "fast"))
+
+TEST_LENGTHS = (2, 6)
+"""Numbers of time periods exercised in the tests.
+
+The conservation property is linear in the number of time periods,
+so a couple of small values cover it; running mostly at the smaller
+one keeps the per-example work down.
+"""
 UNREASONABLY_LARGE_FLUX_MAGNITUDE = 1e30
 """A flux that is unreasonably large in magnitude.
 
 Needed to provide bounds for fluxes
 """
+UNREASONABLY_SMALL_PAR = 1e-30
+"""A positive PAR small beyond physical relevance.
+
+Nonzero :abbr:`PAR (Photosynthetically Active Radiation)` below this
+can push the flux-over-mean-PAR ratio outside float64 range, where
+the conservation property cannot hold in floating point.
+"""
+
+
+@njit(cache=True, fastmath=False)
+def _check_sum_equal(downscaled, coarse, factor):
+    """Check that each column of `downscaled` sums to `coarse` * `factor`.
+
+    Fuses the time-axis sum and the tolerance check into one pass,
+    where ``np_tst.assert_allclose`` builds several temporary arrays
+    and formats a message even on success -- overhead Hypothesis pays
+    once per example.  fastmath stays off so the tolerances keep
+    their IEEE meaning.
+
+    Parameters
+    ----------
+    downscaled : np.ndarray[N, I, J]
+        The downscaled fluxes.
+    coarse : np.ndarray[I, J]
+        The fluxes that were downscaled.
+    factor : float
+        How much larger the sum of each column of `downscaled`
+        should be than `coarse`.
+
+    Returns
+    -------
+    tuple of (int, int, float)
+        Indices and column sum of the first mismatch, or
+        ``(-1, -1, 0.0)`` if every column checks out.
+    """
+    for i in range(coarse.shape[0]):
+        for j in range(coarse.shape[1]):
+            total = 0.0
+            for t in range(downscaled.shape[0]):
+                total += downscaled[t, i, j]
+            expected = coarse[i, j] * factor
+            if total == expected:
+                continue
+            if not abs(total - expected) <= 1e-100 + 1e-7 * abs(expected):
+                return (i, j, total)
+    return (-1, -1, 0.0)
 
 
 # Not entirely sure what units Photosynthetically Active Radiation is
 # usually reported in, but I think 1e30 is bigger than anything that
 # would be relevant.
-@given(
-    arrays(
-        np.float, (3, 5), elements=floats(min_value=0, allow_infinity=False)
-    ),
-    arrays(
-        np.float, (TEST_LENGTH, 3, 5),
-        elements=floats(min_value=0, max_value=1e30)
-    ).filter(
-        lambda par: np.all(np.any(par != 0, axis=0))
+def _make_par_pool(test_length, size=64):
+    """Materialize `size` PAR arrays with nonzero time columns.
+
+    The downscaling divides by the time mean of PAR, so every (i, j)
+    column needs at least one nonzero entry; arrays violating that
+    are repaired in place.  Building the pool once at import moves
+    the expensive many-element draws out of the per-example path:
+    Hypothesis then picks pool members by index and spends its budget
+    on the fluxes and temperatures instead.
+
+    Parameters
+    ----------
+    test_length : int
+        Number of time periods in each array.
+    size : int, optional
+        Number of arrays to generate.
+
+    Returns
+    -------
+    list of np.ndarray[test_length, 3, 5]
+        Valid nonnegative PAR arrays, roughly half zeros.
+    """
+    random = np.random.default_rng(seed=test_length)
+    pool = []
+    for _ in range(size):
+        par = random.uniform(UNREASONABLY_SMALL_PAR, 1e30,
+                             (test_length, 3, 5))
+        par[random.random(par.shape) < 0.5] = 0
+        zero_columns = ~np.any(par != 0, axis=0)
+        if zero_columns.any():
+            par[random.integers(test_length)][zero_columns] = (
+                random.uniform(UNREASONABLY_SMALL_PAR, 1e30)
+            )
+        pool.append(par)
+    return pool
+
+
+_PAR_POOLS = {
+    test_length: _make_par_pool(test_length)
+    for test_length in TEST_LENGTHS
+}
+"""Pools of valid PAR arrays, keyed by number of time periods."""
+
+
+def par_with_nonzero_columns(test_length):
+    """Pick a PAR array with a nonzero value in every time column.
+
+    Parameters
+    ----------
+    test_length : int
+        Number of time periods; must be in :data:`TEST_LENGTHS`.
+
+    Returns
+    -------
+    hypothesis.strategies.SearchStrategy
+        Strategy sampling np.ndarray[test_length, 3, 5] of
+        nonnegative floats from :data:`_PAR_POOLS`.
+    """
+    return st.sampled_from(_PAR_POOLS[test_length])
+
+
+def _assert_conservation(downscaled, coarse, test_length, nonneg):
+    """Check the post-conditions shared by the downscaling tests.
+
+    Parameters
+    ----------
+    downscaled : np.ndarray[test_length, 3, 5]
+        The downscaled fluxes.
+    coarse : np.ndarray[3, 5]
+        The fluxes that were downscaled.
+    test_length : int
+        The number of time periods in `downscaled`.
+    nonneg : bool
+        Whether the downscaled fluxes must be nonnegative; true for
+        the GPP and respiration components, false for NEE.
+    """
+    assert downscaled.shape == (test_length,) + coarse.shape
+    if nonneg:
+        assert downscaled.min() >= 0
+    mismatch = _check_sum_equal(downscaled, coarse, test_length)
+    assert mismatch[0] == -1, (
+        "column ({0:d}, {1:d}) sums to {2:g}".format(*mismatch)
     )
-)
-def test_olsen_randerson_gpp_once(flux_gpp, par):
+
+
+def coarse_flux(min_value):
+    """Generate a coarse-resolution flux to downscale.
+
+    Parameters
+    ----------
+    min_value : float
+        The smallest flux to generate; the largest is
+        :data:`UNREASONABLY_LARGE_FLUX_MAGNITUDE`.
+
+    Returns
+    -------
+    hypothesis.strategies.SearchStrategy
+        Strategy generating np.ndarray[3, 5] of floats.
+    """
+    return arrays(
+        np.float64, (3, 5),
+        elements=floats(min_value=min_value,
+                        max_value=+UNREASONABLY_LARGE_FLUX_MAGNITUDE),
+        fill=floats(max(min_value, -1.0), 1.0)
+    )
+
+
+def temperature_series(test_length):
+    """Generate a downscaled-resolution temperature record.
+
+    Parameters
+    ----------
+    test_length : int
+        Number of time periods to generate.
+
+    Returns
+    -------
+    hypothesis.strategies.SearchStrategy
+        Strategy generating np.ndarray[test_length, 3, 5] of degrees
+        Celsius.
+    """
+    return arrays(
+        np.float64, (test_length, 3, 5),
+        elements=floats(min_value=-100, max_value=100),
+        fill=floats(-1, 1)
+    )
+
+
+def test_olsen_randerson_once_grid_flux_long_series():
+    """Test NEE downscaling with per-cell fluxes and a long time axis.
+
+    Fluxes that already have the grid shape pass through
+    ``np.broadcast_to`` as read-only views, and more time periods than
+    ``_SPECIALIZE_MAX_TIMESTEPS`` reach the kernel compiled at import,
+    which must accept read-only flux arguments.  The property tests
+    above only use scalar-broadcast fluxes and short time axes, so
+    neither path is covered there.
+    """
+    test_length = olsen_randerson._SPECIALIZE_MAX_TIMESTEPS + 1
+    random = np.random.default_rng(seed=test_length)
+    par = random.uniform(0, 100, (test_length, 3, 5))
+    temperature = random.uniform(-30, 30, (test_length, 3, 5))
+    flux_nee = random.uniform(-10, 10, (3, 5))
+    flux_nee_downscaled = olsen_randerson.olsen_randerson_once(
+        flux_nee, temperature, par
+    )
+    _assert_conservation(flux_nee_downscaled, flux_nee, test_length,
+                         nonneg=False)
+
+
+@pytest.mark.parametrize("disabled_accelerators",
+                         [(), ("numba",), ("numba", "numexpr")])
+def test_olsen_randerson_once_dtype(disabled_accelerators, monkeypatch):
+    """Test the float32 working precision on each dispatch branch.
+
+    Disabling the optional accelerators one at a time walks the
+    dispatch through every branch available in this environment; each
+    must return float32 when asked and stay close to the float64
+    result, rather than quietly promoting.
+    """
+    for name in disabled_accelerators:
+        monkeypatch.setattr(olsen_randerson, name, None)
+    test_length = 6
+    random = np.random.default_rng(seed=test_length)
+    par = random.uniform(0, 100, (test_length, 3, 5))
+    temperature = random.uniform(-30, 30, (test_length, 3, 5))
+    flux_nee = random.uniform(-10, 10, (3, 5))
+    downscaled = olsen_randerson.olsen_randerson_once(
+        flux_nee, temperature, par, dtype=np.float32
+    )
+    reference = olsen_randerson.olsen_randerson_once(
+        flux_nee, temperature, par
+    )
+    assert downscaled.dtype == np.float32
+    assert reference.dtype == np.float64
+    np_tst.assert_allclose(downscaled, reference, rtol=1e-4,
+                           atol=1e-4 * np.abs(reference).max())
+
+
+def test_integer_and_strided_inputs():
+    """Test the public entry points on integer and transposed inputs.
+
+    Integer drivers must get float64 working buffers, and
+    non-contiguous drivers a copy to C order, without changing the
+    results.
+    """
+    flux = np.array(6.0)
+    par = np.array([[0, 1], [2, 3], [4, 5]])
+    np_tst.assert_allclose(
+        olsen_randerson.olsen_randerson_gpp_once(flux, par),
+        olsen_randerson.olsen_randerson_gpp_once(flux, par.astype(float)),
+    )
+    temperature = np.array([[0, 10], [20, 30], [10, 20]])
+    np_tst.assert_allclose(
+        olsen_randerson.olsen_randerson_resp_once(flux, temperature),
+        olsen_randerson.olsen_randerson_resp_once(
+            flux, temperature.astype(float)
+        ),
+    )
+    par_fortran = np.asfortranarray(par.astype(float))
+    assert not par_fortran.flags.c_contiguous
+    np_tst.assert_allclose(
+        olsen_randerson.olsen_randerson_gpp_once(flux, par_fortran),
+        olsen_randerson.olsen_randerson_gpp_once(flux, par.astype(float)),
+    )
+    temperature_fortran = np.asfortranarray(temperature.astype(float))
+    np_tst.assert_allclose(
+        olsen_randerson.olsen_randerson_resp_once(flux, temperature_fortran),
+        olsen_randerson.olsen_randerson_resp_once(
+            flux, temperature.astype(float)
+        ),
+    )
+
+
+def test_mean_buffer_reuse():
+    """Test the buffer-reuse hooks meant for callers in a loop."""
+    flux = np.array(6.0)
+    random = np.random.default_rng(seed=8)
+    par = random.uniform(0, 100, (6, 3, 5))
+    temperature = random.uniform(-30, 30, (6, 3, 5))
+    mean_buffer = np.empty(par.shape[1:])
+    np_tst.assert_allclose(
+        olsen_randerson._gpp_once(flux, par, par_total_buf=mean_buffer),
+        olsen_randerson.olsen_randerson_gpp_once(flux, par),
+    )
+    np_tst.assert_allclose(
+        olsen_randerson._resp_once(flux, temperature,
+                                   resp_total_buf=mean_buffer),
+        olsen_randerson.olsen_randerson_resp_once(flux, temperature),
+    )
+
+
+@pytest.mark.skipif(olsen_randerson.numexpr is None,
+                    reason="numexpr not installed")
+def test_olsen_randerson_once_numexpr_integer(monkeypatch):
+    """Test the numexpr branch on integer drivers.
+
+    Integer temperatures keep the Python-float constants, so the
+    result promotes to float64 as on the other branches.
+    """
+    monkeypatch.setattr(olsen_randerson, "numba", None)
+    par = np.array([[0, 1], [2, 3], [4, 5]])
+    temperature = np.array([[0, 10], [20, 30], [10, 20]])
+    flux_nee = np.array(5)
+    with_numexpr = olsen_randerson.olsen_randerson_once(
+        flux_nee, temperature, par
+    )
+    monkeypatch.setattr(olsen_randerson, "numexpr", None)
+    without_numexpr = olsen_randerson.olsen_randerson_once(
+        flux_nee, temperature, par
+    )
+    assert with_numexpr.dtype == np.float64
+    np_tst.assert_allclose(with_numexpr, without_numexpr)
+
+
+@pytest.mark.skipif(olsen_randerson.numexpr is None,
+                    reason="numexpr not installed")
+@pytest.mark.parametrize("dtype", [None, np.float32])
+def test_olsen_randerson_once_numexpr_branch(dtype, monkeypatch):
+    """Test the numexpr branch against the plain-NumPy path.
+
+    The branch is shadowed whenever numba is importable, so force it
+    by disabling numba; check both precisions, since the float32 case
+    once returned float64 from this branch alone.
+    """
+    test_length = 6
+    random = np.random.default_rng(seed=test_length)
+    par = random.uniform(0, 100, (test_length, 3, 5))
+    temperature = random.uniform(-30, 30, (test_length, 3, 5))
+    flux_nee = random.uniform(-10, 10, (3, 5))
+    monkeypatch.setattr(olsen_randerson, "numba", None)
+    with_numexpr = olsen_randerson.olsen_randerson_once(
+        flux_nee, temperature, par, dtype=dtype
+    )
+    monkeypatch.setattr(olsen_randerson, "numexpr", None)
+    without_numexpr = olsen_randerson.olsen_randerson_once(
+        flux_nee, temperature, par, dtype=dtype
+    )
+    assert with_numexpr.dtype == without_numexpr.dtype
+    if dtype is not None:
+        assert with_numexpr.dtype == dtype
+    np_tst.assert_allclose(with_numexpr, without_numexpr, rtol=1e-5,
+                           atol=1e-5 * np.abs(without_numexpr).max())
+
+
+@pytest.mark.parametrize("test_length", TEST_LENGTHS)
+@given(data=st.data())
+def test_olsen_randerson_gpp_once(test_length, data):
     """Test single downscaling of GPP."""
-    assume(np.all(np.any(par != 0, axis=0)))
+    flux_gpp = data.draw(coarse_flux(0), label="flux_gpp")
+    par = data.draw(par_with_nonzero_columns(test_length), label="par")
     flux_gpp_downscaled = olsen_randerson.olsen_randerson_gpp_once(
         flux_gpp, par
     )
-    assert flux_gpp_downscaled.shape == par.shape
-    assert np.all(flux_gpp_downscaled >= 0)
-    flux_gpp_downscaled_upscaled = flux_gpp_downscaled.sum(axis=0)
-    assert flux_gpp_downscaled_upscaled.shape == flux_gpp.shape
-    np_tst.assert_allclose(flux_gpp_downscaled_upscaled,
-                           flux_gpp * TEST_LENGTH,
-                           atol=1e-100)
-
-
-@given(
-    arrays(
-        np.float, (3, 5),
-        elements=floats(
-            min_value=0, max_value=+UNREASONABLY_LARGE_FLUX_MAGNITUDE
-        )
-    ),
-    arrays(
-        np.float, (TEST_LENGTH, 3, 5),
-        elements=floats(min_value=-100, max_value=100)
-    )
-)
-def test_olsen_randerson_resp_once(flux_resp, temperature):
+    _assert_conservation(flux_gpp_downscaled, flux_gpp, test_length,
+                         nonneg=True)
+
+
+@pytest.mark.parametrize("test_length", TEST_LENGTHS)
+@given(data=st.data())
+def test_olsen_randerson_resp_once(test_length, data):
     """Test single downscaling of respiration."""
+    flux_resp = data.draw(coarse_flux(0), label="flux_resp")
+    temperature = data.draw(temperature_series(test_length),
+                            label="temperature")
     flux_resp_downscaled = olsen_randerson.olsen_randerson_resp_once(
         flux_resp, temperature
     )
-    assert flux_resp_downscaled.shape == temperature.shape
-    assert np.all(flux_resp_downscaled >= 0)
-    flux_resp_downscaled_upscaled = flux_resp_downscaled.sum(axis=0)
-    assert flux_resp_downscaled_upscaled.shape == flux_resp.shape
-    np_tst.assert_allclose(flux_resp_downscaled_upscaled,
-                           flux_resp * TEST_LENGTH,
-                           atol=1e-100)
-
-
-@given(
-    arrays(
-        np.float, (3, 5),
-        elements=floats(min_value=-UNREASONABLY_LARGE_FLUX_MAGNITUDE,
-                        max_value=+UNREASONABLY_LARGE_FLUX_MAGNITUDE)
-    ),
-    arrays(
-        np.float, (TEST_LENGTH, 3, 5),
-        elements=floats(min_value=-100, max_value=100)
-    ),
-    arrays(
-        np.float, (TEST_LENGTH, 3, 5),
-        elements=floats(min_value=0, max_value=1e30)
-    ).filter(
-        lambda par: np.all(np.any(par != 0, axis=0))
-    )
-)
-def test_olsen_randerson_once(flux_nee, temperature, par):
+    _assert_conservation(flux_resp_downscaled, flux_resp, test_length,
+                         nonneg=True)
+
+
+@pytest.mark.parametrize("test_length", TEST_LENGTHS)
+@given(data=st.data())
+def test_olsen_randerson_once(test_length, data):
     """Test single downscaling of NEE."""
-    assume(np.all(np.any(par != 0, axis=0)))
+    flux_nee = data.draw(
+        coarse_flux(-UNREASONABLY_LARGE_FLUX_MAGNITUDE), label="flux_nee"
+    )
+    temperature = data.draw(temperature_series(test_length),
+                            label="temperature")
+    par = data.draw(par_with_nonzero_columns(test_length), label="par")
     flux_nee_downscaled = olsen_randerson.olsen_randerson_once(
         flux_nee, temperature, par
     )
-    assert flux_nee_downscaled.shape == temperature.shape
-    flux_nee_downscaled_upscaled = flux_nee_downscaled.sum(axis=0)
-    assert flux_nee_downscaled_upscaled.shape == flux_nee.shape
-    np_tst.assert_allclose(flux_nee_downscaled_upscaled,
-                           flux_nee * TEST_LENGTH,
-                           atol=1e-100)
+    _assert_conservation(flux_nee_downscaled, flux_nee, test_length,
+                         nonneg=False)